@@ -1,5 +1,10 @@
 """Infrastructure for Ethan's Services in GCP"""
 
+import hashlib
+import json
+import pathlib
+import re
+
 import pulumi
 from pulumi_gcp import (
     container,
@@ -8,6 +13,13 @@ from pulumi_gcp import (
     artifactregistry,
     secretmanager,
     cloudbuild,
+    pubsub,
+    logging,
+    storage,
+    compute,
+    certificatemanager,
+    redis,
+    monitoring,
 )
 import pulumi_kubernetes as k8s
 
@@ -17,6 +29,7 @@ project = "ethans-services"
 region = "us-central1"
 zone = "us-central1-a"
 github_owner = "eswan18"
+project_number = "754418346661"
 cloud_build_sa = f"projects/{project}/serviceAccounts/754418346661-compute@developer.gserviceaccount.com"
 
 # Artifact Registry repository
@@ -30,10 +43,148 @@ container_registry = artifactregistry.Repository(
     opts=pulumi.ResourceOptions(protect=True),
 )
 
+# Secret delivery settings
+# `secret-rotation-interval` (e.g. "120s") turns on rotation polling for the
+# CSI driver and, if enabled, the GKE-managed Secret Manager add-on.
+secret_rotation_interval = config.get("secret-rotation-interval")
+gke_secret_manager_addon = config.get_bool("gke-secret-manager-addon") or False
+# "auto" (global) or "regional" (user-managed, pinned to `region`). Secrets
+# are protected, so switching an existing stack means recreating them.
+secret_replication = config.get("secret-replication") or "auto"
+
+# Cluster networking
+# NodeLocal DNSCache can be toggled in place. Dataplane V2 can only be set at
+# cluster creation, so enabling it on the existing (protected) cluster means
+# a planned rebuild. Datapath observability requires Dataplane V2.
+node_local_dns_cache = config.get_bool("node-local-dns-cache") or False
+dataplane_v2 = config.get_bool("dataplane-v2") or False
+datapath_observability = config.get_bool("datapath-observability") or False
+if datapath_observability and not dataplane_v2:
+    raise ValueError("datapath-observability requires dataplane-v2")
+
+# Node pool autoscaling, keyed by pool name, e.g.
+#   {"spot-pool-medium": {"min_node_count": 1, "max_node_count": 3}}
+# Pools without an entry keep their fixed node count.
+node_pool_autoscaling = config.get_object("node-pool-autoscaling") or {}
+
+
+def fixed_node_count(pool: str, count: int) -> dict:
+    """`node_count` for pools without autoscaling.
+
+    Autoscaled pools must not send a node count, or every `pulumi up` would
+    resize them back and evict the capacity the autoscaler added.
+    """
+    if pool in node_pool_autoscaling:
+        return {}
+    return {"node_count": count}
+
+
+# Zones for node pools. The control plane stays in `zone`, but pools can span
+# several zones so spot capacity is drawn from more than one (updated in place).
+# node_count, initial_node_count and autoscaling bounds are per zone, so listing
+# three zones triples every fixed pool, default-pool-std2 included.
+node_zones = config.get_object("node-zones") or [zone]
+
+# Node disk and image GC tuning, keyed by pool name, e.g.
+#   {"spot-pool-medium": {"disk_type": "pd-ssd", "disk_size_gb": 50,
+#                         "image_gc_high_threshold_percent": 85,
+#                         "image_gc_low_threshold_percent": 70,
+#                         "container_log_max_size": "10Mi",
+#                         "container_log_max_files": 3}}
+# Boot disk changes roll the pool's nodes and kubelet settings update in
+# place. `local_ssd_count` backs ephemeral storage (image layers, emptyDir)
+# with local SSD; it can only be set when a pool is created, so it's limited
+# to separately managed pools (inline cluster pools are ForceNew and would
+# replace the protected cluster) on machine types that support local SSD.
+node_pool_disk_settings = config.get_object("node-pool-disks") or {}
+kubelet_disk_keys = [
+    "image_gc_high_threshold_percent",
+    "image_gc_low_threshold_percent",
+    "image_minimum_gc_age",
+    "container_log_max_size",
+    "container_log_max_files",
+]
+# Machine families with attachable local SSD; `-lssd` types bundle their own.
+local_ssd_machine_families = ("n1-", "n2-", "n2d-", "c2-", "c2d-")
+
+
+def tuned_node_config(pool: str, node_config: dict, inline: bool = True) -> dict:
+    """Apply the pool's `node-pool-disks` overrides to its node_config.
+
+    `inline` marks pools declared in the cluster's node_pools list, which
+    can't take local SSD without replacing the cluster.
+    """
+    settings = node_pool_disk_settings.get(pool)
+    if not settings:
+        return node_config
+    # Kubelet defaults are 85/80, so check against those if one is unset.
+    gc_high = settings.get("image_gc_high_threshold_percent", 85)
+    gc_low = settings.get("image_gc_low_threshold_percent", 80)
+    if gc_high <= gc_low:
+        raise ValueError(
+            f"{pool}: image_gc_high_threshold_percent ({gc_high}) must be "
+            f"greater than image_gc_low_threshold_percent ({gc_low})"
+        )
+    disk_type = settings.get("disk_type", node_config["disk_type"])
+    disk_size_gb = settings.get("disk_size_gb", node_config["disk_size_gb"])
+    tuned = {
+        **node_config,
+        "boot_disk": {"disk_type": disk_type, "size_gb": disk_size_gb},
+        "disk_size_gb": disk_size_gb,
+        "disk_type": disk_type,
+        "kubelet_config": {
+            **node_config["kubelet_config"],
+            **{key: settings[key] for key in kubelet_disk_keys if key in settings},
+        },
+    }
+    if settings.get("local_ssd_count"):
+        machine_type = node_config["machine_type"]
+        if inline:
+            raise ValueError(
+                f"{pool}: local_ssd_count is only supported on separately "
+                "managed node pools"
+            )
+        if not (
+            machine_type.startswith(local_ssd_machine_families)
+            or machine_type.endswith("-lssd")
+        ):
+            raise ValueError(
+                f"{pool}: machine type {machine_type} doesn't support local SSD"
+            )
+        tuned["ephemeral_storage_local_ssd_config"] = {
+            "local_ssd_count": settings["local_ssd_count"],
+        }
+    return tuned
+
+
+# Compute-optimized node pool settings (the pool itself is declared after
+# the cluster). Enabled with the `compute-pool` config object, e.g.
+#   {"machine_type": "c3-standard-4", "node_count": 1, "spot": false}
+compute_pool_settings = config.get_object("compute-pool")
+compute_pool_taint = {"key": "workload-class", "value": "compute"}
+
+# Public services exposed through the GKE Gateway, keyed by namespace, e.g.
+#   {"fitness-dashboard-prod": {
+#       "hostname": "fitness.example.com", "service": "fitness-dashboard",
+#       "port": 80,
+#       "cdn": {"default_ttl": 3600, "max_ttl": 86400,
+#               "include_query_string": false},
+#       "selector": {"app": "fitness-dashboard"},
+#       "routes": [{"path": "/assets", "cache_max_age": 31536000,
+#                   "cdn": {"default_ttl": 86400, "max_ttl": 31536000}}]}}
+# The top-level `cdn` caches the service's default backend. Cloud CDN cache
+# key and TTLs are per backend, so a route with its own `cdn` is served by a
+# dedicated Service built from `selector` (and `target_port`, defaulting to
+# `port`). `cache_max_age` sets the route's client-facing Cache-Control.
+# Services without any `cdn` entry are routed but not cached.
+public_services = config.get_object("public-services") or {}
+
 # GKE Cluster
-main_cluster = container.Cluster(
-    "main-cluster",
+main_cluster_args = dict(
     addons_config={
+        "dns_cache_config": {
+            "enabled": node_local_dns_cache,
+        },
         "gce_persistent_disk_csi_driver_config": {
             "enabled": True,
         },
@@ -56,10 +207,12 @@ main_cluster = container.Cluster(
             "enabled": True,
         },
     },
+    datapath_provider="ADVANCED_DATAPATH" if dataplane_v2 else None,
     database_encryption={
         "state": "DECRYPTED",
     },
     default_max_pods_per_node=110,
+    gateway_api_config={"channel": "CHANNEL_STANDARD"} if public_services else None,
     location=zone,
     logging_config={
         "enable_components": [
@@ -74,7 +227,7 @@ main_cluster = container.Cluster(
     },
     monitoring_config={
         "advanced_datapath_observability_config": {
-            "enable_metrics": False,
+            "enable_metrics": datapath_observability,
             "enable_relay": False,
         },
         "enable_components": [
@@ -140,6 +293,7 @@ main_cluster = container.Cluster(
     },
     node_pools=[
         {
+            "autoscaling": node_pool_autoscaling.get("spot-pool-medium"),
             "initial_node_count": 1,
             "max_pods_per_node": 110,
             "name": "spot-pool-medium",
@@ -147,48 +301,52 @@ main_cluster = container.Cluster(
                 "pod_ipv4_cidr_block": "10.36.0.0/14",
                 "pod_range": "gke-main-cluster-pods-3fd139f8",
             },
-            "node_config": {
-                "boot_disk": {
+            "node_config": tuned_node_config(
+                "spot-pool-medium",
+                {
+                    "boot_disk": {
+                        "disk_type": "pd-balanced",
+                        "size_gb": 20,
+                    },
+                    "disk_size_gb": 20,
                     "disk_type": "pd-balanced",
-                    "size_gb": 20,
-                },
-                "disk_size_gb": 20,
-                "disk_type": "pd-balanced",
-                "image_type": "COS_CONTAINERD",
-                "kubelet_config": {
-                    "insecure_kubelet_readonly_port_enabled": "FALSE",
-                    "max_parallel_image_pulls": 2,
-                },
-                "logging_variant": "DEFAULT",
-                "machine_type": "e2-medium",
-                "metadata": {
-                    "disable-legacy-endpoints": "true",
-                },
-                "oauth_scopes": [
-                    "https://www.googleapis.com/auth/devstorage.read_only",
-                    "https://www.googleapis.com/auth/logging.write",
-                    "https://www.googleapis.com/auth/monitoring",
-                    "https://www.googleapis.com/auth/service.management.readonly",
-                    "https://www.googleapis.com/auth/servicecontrol",
-                    "https://www.googleapis.com/auth/trace.append",
-                ],
-                "resource_labels": {
-                    "goog-gke-node-pool-provisioning-model": "spot",
-                },
-                "service_account": "default",
-                "spot": True,
-                "workload_metadata_config": {
-                    "mode": "GKE_METADATA",
+                    "image_type": "COS_CONTAINERD",
+                    "kubelet_config": {
+                        "insecure_kubelet_readonly_port_enabled": "FALSE",
+                        "max_parallel_image_pulls": 2,
+                    },
+                    "logging_variant": "DEFAULT",
+                    "machine_type": "e2-medium",
+                    "metadata": {
+                        "disable-legacy-endpoints": "true",
+                    },
+                    "oauth_scopes": [
+                        "https://www.googleapis.com/auth/devstorage.read_only",
+                        "https://www.googleapis.com/auth/logging.write",
+                        "https://www.googleapis.com/auth/monitoring",
+                        "https://www.googleapis.com/auth/service.management.readonly",
+                        "https://www.googleapis.com/auth/servicecontrol",
+                        "https://www.googleapis.com/auth/trace.append",
+                    ],
+                    "resource_labels": {
+                        "goog-gke-node-pool-provisioning-model": "spot",
+                    },
+                    "service_account": "default",
+                    "spot": True,
+                    "workload_metadata_config": {
+                        "mode": "GKE_METADATA",
+                    },
                 },
-            },
-            "node_count": 1,
-            "node_locations": [zone],
+            ),
+            **fixed_node_count("spot-pool-medium", 1),
+            "node_locations": node_zones,
             "upgrade_settings": {
                 "max_surge": 1,
             },
             "version": "1.33.5-gke.2172001",
         },
         {
+            "autoscaling": node_pool_autoscaling.get("default-pool-std2"),
             "initial_node_count": 1,
             "max_pods_per_node": 110,
             "name": "default-pool-std2",
@@ -196,41 +354,44 @@ main_cluster = container.Cluster(
                 "pod_ipv4_cidr_block": "10.36.0.0/14",
                 "pod_range": "gke-main-cluster-pods-3fd139f8",
             },
-            "node_config": {
-                "boot_disk": {
+            "node_config": tuned_node_config(
+                "default-pool-std2",
+                {
+                    "boot_disk": {
+                        "disk_type": "pd-balanced",
+                        "size_gb": 100,
+                    },
+                    "disk_size_gb": 100,
                     "disk_type": "pd-balanced",
-                    "size_gb": 100,
-                },
-                "disk_size_gb": 100,
-                "disk_type": "pd-balanced",
-                "image_type": "COS_CONTAINERD",
-                "kubelet_config": {
-                    "insecure_kubelet_readonly_port_enabled": "FALSE",
-                    "max_parallel_image_pulls": 2,
-                },
-                "logging_variant": "DEFAULT",
-                "machine_type": "e2-standard-2",
-                "metadata": {
-                    "disable-legacy-endpoints": "true",
-                },
-                "oauth_scopes": [
-                    "https://www.googleapis.com/auth/devstorage.read_only",
-                    "https://www.googleapis.com/auth/logging.write",
-                    "https://www.googleapis.com/auth/monitoring",
-                    "https://www.googleapis.com/auth/service.management.readonly",
-                    "https://www.googleapis.com/auth/servicecontrol",
-                    "https://www.googleapis.com/auth/trace.append",
-                ],
-                "resource_labels": {
-                    "goog-gke-node-pool-provisioning-model": "on-demand",
+                    "image_type": "COS_CONTAINERD",
+                    "kubelet_config": {
+                        "insecure_kubelet_readonly_port_enabled": "FALSE",
+                        "max_parallel_image_pulls": 2,
+                    },
+                    "logging_variant": "DEFAULT",
+                    "machine_type": "e2-standard-2",
+                    "metadata": {
+                        "disable-legacy-endpoints": "true",
+                    },
+                    "oauth_scopes": [
+                        "https://www.googleapis.com/auth/devstorage.read_only",
+                        "https://www.googleapis.com/auth/logging.write",
+                        "https://www.googleapis.com/auth/monitoring",
+                        "https://www.googleapis.com/auth/service.management.readonly",
+                        "https://www.googleapis.com/auth/servicecontrol",
+                        "https://www.googleapis.com/auth/trace.append",
+                    ],
+                    "resource_labels": {
+                        "goog-gke-node-pool-provisioning-model": "on-demand",
+                    },
+                    "service_account": "default",
+                    "workload_metadata_config": {
+                        "mode": "GKE_METADATA",
+                    },
                 },
-                "service_account": "default",
-                "workload_metadata_config": {
-                    "mode": "GKE_METADATA",
-                },
-            },
-            "node_count": 1,
-            "node_locations": [zone],
+            ),
+            **fixed_node_count("default-pool-std2", 1),
+            "node_locations": node_zones,
             "upgrade_settings": {
                 "max_surge": 1,
             },
@@ -269,7 +430,12 @@ main_cluster = container.Cluster(
         "channel": "REGULAR",
     },
     secret_manager_config={
-        "enabled": False,
+        "enabled": gke_secret_manager_addon,
+        "rotation_config": {
+            "enabled": gke_secret_manager_addon
+            and secret_rotation_interval is not None,
+            "rotation_interval": secret_rotation_interval,
+        },
     },
     secret_sync_config={
         "enabled": False,
@@ -285,9 +451,130 @@ main_cluster = container.Cluster(
     workload_identity_config={
         "workload_pool": f"{project}.svc.id.goog",
     },
+)
+main_cluster = container.Cluster(
+    "main-cluster",
+    **main_cluster_args,
     opts=pulumi.ResourceOptions(protect=True),
 )
 
+# Regional cluster (migration target)
+# Location can't change in place and main-cluster is protected, so moving to a
+# regional control plane is blue/green: enable `regional-cluster` to build
+# main-cluster-regional alongside it with the same settings and pools spread
+# across `regional-node-zones`, move workloads over, then remove protection
+# from main-cluster and retire it deliberately.
+regional_cluster = None
+if config.get_bool("regional-cluster"):
+    regional_node_zones = config.get_object("regional-node-zones") or [
+        f"{region}-a",
+        f"{region}-b",
+        f"{region}-c",
+    ]
+    regional_cluster = container.Cluster(
+        "main-cluster-regional",
+        **{
+            **main_cluster_args,
+            "name": "main-cluster-regional",
+            "location": region,
+            "node_locations": regional_node_zones,
+            "cluster_ipv4_cidr": config.get("regional-cluster-ipv4-cidr")
+            or "10.40.0.0/14",
+            # The DNS endpoint and pod range names are specific to main-cluster.
+            "control_plane_endpoints_config": {
+                "ip_endpoints_config": {
+                    "enabled": True,
+                },
+            },
+            "node_pools": [
+                {
+                    **{k: v for k, v in pool.items() if k != "network_config"},
+                    "node_locations": regional_node_zones,
+                }
+                for pool in main_cluster_args["node_pools"]
+            ],
+        },
+        opts=pulumi.ResourceOptions(protect=True),
+    )
+
+
+# Compute-optimized node pool for CPU-bound workloads
+# A separate NodePool resource rather than an entry in the cluster's inline
+# node_pools, which GKE treats as ForceNew (adding one would replace the
+# protected cluster). Nodes are tainted so only workloads placed there (see
+# `service-placement`) schedule onto them, and use the static CPU manager
+# policy so Guaranteed pods with integer CPU requests get exclusive cores.
+compute_node_pool = None
+if compute_pool_settings:
+    compute_pool_spot = compute_pool_settings.get("spot", False)
+    compute_node_pool = container.NodePool(
+        "compute-pool",
+        cluster=main_cluster.name,
+        location=zone,
+        project=project,
+        autoscaling=node_pool_autoscaling.get("compute-pool"),
+        initial_node_count=compute_pool_settings.get("node_count", 1),
+        max_pods_per_node=110,
+        name="compute-pool",
+        network_config={
+            "pod_ipv4_cidr_block": "10.36.0.0/14",
+            "pod_range": "gke-main-cluster-pods-3fd139f8",
+        },
+        node_config=tuned_node_config(
+            "compute-pool",
+            {
+                "boot_disk": {
+                    "disk_type": "pd-balanced",
+                    "size_gb": 50,
+                },
+                "disk_size_gb": 50,
+                "disk_type": "pd-balanced",
+                "image_type": "COS_CONTAINERD",
+                "kubelet_config": {
+                    "cpu_cfs_quota": True,
+                    "cpu_manager_policy": "static",
+                    "insecure_kubelet_readonly_port_enabled": "FALSE",
+                    "max_parallel_image_pulls": 2,
+                },
+                "labels": {
+                    compute_pool_taint["key"]: compute_pool_taint["value"],
+                },
+                "logging_variant": "DEFAULT",
+                "machine_type": compute_pool_settings.get(
+                    "machine_type", "c3-standard-4"
+                ),
+                "metadata": {
+                    "disable-legacy-endpoints": "true",
+                },
+                "oauth_scopes": [
+                    "https://www.googleapis.com/auth/devstorage.read_only",
+                    "https://www.googleapis.com/auth/logging.write",
+                    "https://www.googleapis.com/auth/monitoring",
+                    "https://www.googleapis.com/auth/service.management.readonly",
+                    "https://www.googleapis.com/auth/servicecontrol",
+                    "https://www.googleapis.com/auth/trace.append",
+                ],
+                "resource_labels": {
+                    "goog-gke-node-pool-provisioning-model": (
+                        "spot" if compute_pool_spot else "on-demand"
+                    ),
+                },
+                "service_account": "default",
+                "spot": compute_pool_spot,
+                "taints": [{**compute_pool_taint, "effect": "NO_SCHEDULE"}],
+                "workload_metadata_config": {
+                    "mode": "GKE_METADATA",
+                },
+            },
+            inline=False,
+        ),
+        **fixed_node_count("compute-pool", compute_pool_settings.get("node_count", 1)),
+        node_locations=node_zones,
+        upgrade_settings={
+            "max_surge": 1,
+        },
+        version="1.33.5-gke.2172001",
+    )
 
 # K8s Provider (uses existing kubeconfig context)
 k8s_provider = k8s.Provider(
@@ -554,15 +841,32 @@ secret_names = [
     # forecasting build (used by Cloud Build, not the app)
     "forecasting_sentry_auth_token",
 ]
+if secret_replication == "regional":
+    secret_replication_args = secretmanager.SecretReplicationArgs(
+        user_managed=secretmanager.SecretReplicationUserManagedArgs(
+            replicas=[
+                secretmanager.SecretReplicationUserManagedReplicaArgs(
+                    location=region,
+                ),
+            ],
+        ),
+    )
+elif secret_replication == "auto":
+    secret_replication_args = secretmanager.SecretReplicationArgs(
+        auto=secretmanager.SecretReplicationAutoArgs(),
+    )
+else:
+    raise ValueError(
+        f"Unknown secret-replication '{secret_replication}' "
+        "(expected one of: auto, regional)"
+    )
 secrets = {}
 for name in secret_names:
     secrets[name] = secretmanager.Secret(
         name,
         secret_id=name,
         project=project,
-        replication=secretmanager.SecretReplicationArgs(
-            auto=secretmanager.SecretReplicationAutoArgs(),
-        ),
+        replication=secret_replication_args,
         opts=pulumi.ResourceOptions(protect=True),
     )
 
@@ -589,79 +893,243 @@ cloud_build_sentry_access = secretmanager.SecretIamMember(
     member=f"serviceAccount:{cloud_build_sa_email}",
 )
 
-# Cloud Build triggers
-fitness_api_build = cloudbuild.Trigger(
-    "fitness-api-build",
-    filename="cloudbuild.yaml",
-    github=cloudbuild.TriggerGithubArgs(
-        name="fitness-api",
-        owner=github_owner,
-        push=cloudbuild.TriggerGithubPushArgs(
-            branch="^main$",
-        ),
-    ),
-    name="fitness-api-build",
-    project=project,
-    service_account=cloud_build_sa,
-)
-fitness_dashboard_build = cloudbuild.Trigger(
-    "fitness-dashboard-build",
-    filename="cloudbuild.yaml",
-    github=cloudbuild.TriggerGithubArgs(
-        name="fitness-dashboard",
-        owner=github_owner,
-        push=cloudbuild.TriggerGithubPushArgs(
-            branch="^main$",
-        ),
-    ),
-    name="fitness-dashboard-build",
+# Shared Memorystore cache tier
+# Optional Redis instance in `region`, enabled with the `memorystore` config
+# object, e.g.
+#   {"tier": "BASIC", "memory_size_gb": 1,
+#    "services": {"fitness-api-prod": 0, "identity-prod": 1}}
+# Each listed service environment gets its own logical database and a
+# `<env>_redis_url` secret readable only by that environment's SA. Database
+# numbers are assigned explicitly so adding or removing a service never moves
+# another service onto a database holding someone else's keys.
+memorystore_settings = config.get_object("memorystore")
+cache_secrets = {}
+if memorystore_settings:
+    cache_instance = redis.Instance(
+        "services-cache",
+        name="services-cache",
+        project=project,
+        region=region,
+        location_id=zone,
+        tier=memorystore_settings.get("tier", "BASIC"),
+        memory_size_gb=memorystore_settings.get("memory_size_gb", 1),
+        redis_version="REDIS_7_2",
+        authorized_network=f"projects/{project}/global/networks/default",
+        auth_enabled=True,
+        redis_configs={"maxmemory-policy": "allkeys-lru"},
+    )
+    cache_services = memorystore_settings.get("services", {})
+    if not isinstance(cache_services, dict):
+        raise ValueError(
+            "memorystore services must map each environment to a database number"
+        )
+    used_db_indexes = {}
+    for env_key, db_index in cache_services.items():
+        if env_key not in secret_access:
+            raise ValueError(f"Unknown memorystore service '{env_key}'")
+        # Redis only has 16 logical databases.
+        if not isinstance(db_index, int) or not 0 <= db_index < 16:
+            raise ValueError(
+                f"memorystore database for '{env_key}' must be an integer 0-15"
+            )
+        if db_index in used_db_indexes:
+            raise ValueError(
+                f"memorystore database {db_index} is assigned to both "
+                f"'{used_db_indexes[db_index]}' and '{env_key}'"
+            )
+        used_db_indexes[db_index] = env_key
+        sa, _ = secret_access[env_key]
+        secret_name = f"{env_key.replace('-', '_')}_redis_url"
+        cache_secrets[secret_name] = secretmanager.Secret(
+            secret_name,
+            secret_id=secret_name,
+            project=project,
+            replication=secret_replication_args,
+        )
+        secretmanager.SecretVersion(
+            f"{secret_name}-version",
+            secret=cache_secrets[secret_name].id,
+            secret_data=pulumi.Output.secret(
+                pulumi.Output.format(
+                    "redis://:{0}@{1}:{2}/{3}",
+                    cache_instance.auth_string,
+                    cache_instance.host,
+                    cache_instance.port,
+                    db_index,
+                )
+            ),
+        )
+        secretmanager.SecretIamMember(
+            f"{env_key}-access-{secret_name}",
+            project=project,
+            secret_id=cache_secrets[secret_name].secret_id,
+            role="roles/secretmanager.secretAccessor",
+            member=sa.email.apply(lambda email: f"serviceAccount:{email}"),
+        )
+
+# Registry-backed layer cache for Cloud Build (docker --cache-from / kaniko)
+build_cache_registry = artifactregistry.Repository(
+    "build-cache",
+    description="Cloud Build layer cache",
+    format="DOCKER",
+    location=region,
     project=project,
-    service_account=cloud_build_sa,
-)
-identity_build = cloudbuild.Trigger(
-    "identity-build",
-    filename="cloudbuild.yaml",
-    github=cloudbuild.TriggerGithubArgs(
-        name="identity",
-        owner=github_owner,
-        push=cloudbuild.TriggerGithubPushArgs(
-            branch="^main$",
+    repository_id="build-cache",
+    cleanup_policies=[
+        artifactregistry.RepositoryCleanupPolicyArgs(
+            id="expire-old-cache",
+            action="DELETE",
+            condition=artifactregistry.RepositoryCleanupPolicyConditionArgs(
+                older_than="1209600s",
+            ),
         ),
-    ),
-    name="identity-build",
-    project=project,
-    service_account=cloud_build_sa,
+    ],
 )
-asset_manager_build = cloudbuild.Trigger(
-    "asset-manager-build",
-    filename="cloudbuild.yaml",
-    github=cloudbuild.TriggerGithubArgs(
-        name="asset_manager",
-        owner=github_owner,
-        push=cloudbuild.TriggerGithubPushArgs(
-            branch="^main$",
+build_cache_url = f"{region}-docker.pkg.dev/{project}/build-cache"
+
+# Optional private worker pool, enabled with the `build-worker-pool` config key
+build_worker_pool = None
+if config.get_bool("build-worker-pool"):
+    build_worker_pool = cloudbuild.WorkerPool(
+        "build-pool",
+        name="build-pool",
+        location=region,
+        project=project,
+        worker_config=cloudbuild.WorkerPoolWorkerConfigArgs(
+            machine_type="e2-standard-4",
+            disk_size_gb=100,
         ),
-    ),
-    name="asset-manager-build",
-    project=project,
-    service_account=cloud_build_sa,
-)
-forecasting_build = cloudbuild.Trigger(
-    "forecasting-build",
-    filename="cloudbuild.yaml",
-    github=cloudbuild.TriggerGithubArgs(
-        name="forecasting",
-        owner=github_owner,
-        push=cloudbuild.TriggerGithubPushArgs(
-            branch="^main$",
+    )
+
+# Cloud Build triggers
+# Changes that only touch these paths never need a new image.
+docs_only_files = ["**/*.md", "docs/**", "LICENSE", ".github/**"]
+# Per-service trigger settings. Build options are opt-in per service via the
+# `build-options` config object, e.g.
+#   {"fitness-api": {"machine_type": "E2_HIGHCPU_8", "cache": true,
+#                    "worker_pool": false}}
+# They reach the build as _MACHINE_TYPE, _BUILD_CACHE and _WORKER_POOL
+# substitutions. Cloud Build rejects substitutions a cloudbuild.yaml doesn't
+# use, so only opt a service in after its cloudbuild.yaml references them.
+build_trigger_settings = {
+    "fitness-api": {"github_repo": "fitness-api"},
+    "fitness-dashboard": {"github_repo": "fitness-dashboard"},
+    "identity": {"github_repo": "identity"},
+    "asset-manager": {"github_repo": "asset_manager"},
+    "forecasting": {"github_repo": "forecasting"},
+}
+build_options = config.get_object("build-options") or {}
+for service in build_options:
+    if service not in build_trigger_settings:
+        raise ValueError(f"Unknown build-options service '{service}'")
+    if build_options[service].get("worker_pool") and build_worker_pool is None:
+        raise ValueError(
+            f"build-options.{service}.worker_pool requires build-worker-pool"
+        )
+build_triggers = {}
+for service, trigger_settings in build_trigger_settings.items():
+    settings = {**trigger_settings, **build_options.get(service, {})}
+    substitutions = {}
+    if "machine_type" in settings:
+        substitutions["_MACHINE_TYPE"] = settings["machine_type"]
+    if settings.get("cache"):
+        substitutions["_BUILD_CACHE"] = f"{build_cache_url}/{service}"
+    if settings.get("worker_pool"):
+        substitutions["_WORKER_POOL"] = build_worker_pool.id
+    build_triggers[service] = cloudbuild.Trigger(
+        f"{service}-build",
+        filename="cloudbuild.yaml",
+        github=cloudbuild.TriggerGithubArgs(
+            name=settings["github_repo"],
+            owner=github_owner,
+            push=cloudbuild.TriggerGithubPushArgs(
+                branch="^main$",
+            ),
         ),
-    ),
-    name="forecasting-build",
-    project=project,
-    service_account=cloud_build_sa,
-)
+        included_files=settings.get("included_files"),
+        ignored_files=settings.get("ignored_files", docs_only_files),
+        substitutions=substitutions or None,
+        name=f"{service}-build",
+        project=project,
+        service_account=cloud_build_sa,
+    )
 
 # ArgoCD (Helm)
+# Resource/tuning profiles for the ArgoCD release, selected with the
+# `argocd-profile` config key. "minimal" keeps the footprint as small as
+# possible; "performance" raises controller processor counts, lengthens the
+# manifest cache TTL, shortens the reconciliation loop and adds a second
+# repo-server so syncs land quickly after a promotion.
+argocd_profiles = {
+    "minimal": {
+        "controller": {
+            "resources": {
+                "requests": {"cpu": "5m", "memory": "64Mi"},
+            },
+        },
+        "repoServer": {
+            "replicas": 1,
+            "resources": {
+                "requests": {"cpu": "100m", "memory": "256Mi"},
+                "limits": {"cpu": "500m", "memory": "512Mi"},
+            },
+        },
+        "redis": {
+            "resources": {
+                "requests": {"cpu": "5m", "memory": "32Mi"},
+            },
+        },
+        "params": {},
+        "cm": {},
+        "metrics": False,
+    },
+    "performance": {
+        "controller": {
+            "resources": {
+                "requests": {"cpu": "250m", "memory": "512Mi"},
+                "limits": {"memory": "1Gi"},
+            },
+        },
+        "repoServer": {
+            "replicas": 2,
+            "resources": {
+                "requests": {"cpu": "250m", "memory": "256Mi"},
+                "limits": {"cpu": "1", "memory": "1Gi"},
+            },
+        },
+        "redis": {
+            "resources": {
+                "requests": {"cpu": "50m", "memory": "128Mi"},
+                "limits": {"memory": "256Mi"},
+            },
+        },
+        "params": {
+            # ArgoCD defaults are 20/10. Processors are cheap worker
+            # goroutines, and a promotion plus an image update can queue
+            # refreshes and syncs for several apps at once, so raise them
+            # well above the app count to keep those from waiting in line.
+            "controller.status.processors": 50,
+            "controller.operation.processors": 25,
+            # Default 24h. Manifests are cached per commit SHA, so a longer TTL
+            # is safe and keeps manifests for quiet repos cached over weekends
+            # instead of regenerating them on the first sync afterwards.
+            "reposerver.repo.cache.expiration": "72h",
+        },
+        "cm": {
+            "timeout.reconciliation": "60s",
+        },
+        "metrics": True,
+    },
+}
+argocd_profile_name = config.get("argocd-profile") or "minimal"
+if argocd_profile_name not in argocd_profiles:
+    raise ValueError(
+        f"Unknown argocd-profile '{argocd_profile_name}' "
+        f"(expected one of: {', '.join(argocd_profiles)})"
+    )
+argocd_profile = argocd_profiles[argocd_profile_name]
+argocd_metrics = {"enabled": argocd_profile["metrics"]}
+
 argocd_release = k8s.helm.v3.Release(
     "argocd",
     chart="argo-cd",
@@ -671,21 +1139,22 @@ argocd_release = k8s.helm.v3.Release(
         repo="https://argoproj.github.io/argo-helm",
     ),
     values={
+        "configs": {
+            "params": argocd_profile["params"],
+            "cm": argocd_profile["cm"],
+        },
         "server": {
             "resources": {
                 "requests": {"cpu": "5m", "memory": "64Mi"},
             },
+            "metrics": argocd_metrics,
         },
         "controller": {
-            "resources": {
-                "requests": {"cpu": "5m", "memory": "64Mi"},
-            },
+            **argocd_profile["controller"],
+            "metrics": argocd_metrics,
         },
         "repoServer": {
-            "resources": {
-                "requests": {"cpu": "100m", "memory": "256Mi"},
-                "limits": {"cpu": "500m", "memory": "512Mi"},
-            },
+            **argocd_profile["repoServer"],
             "livenessProbe": {
                 "timeoutSeconds": 5,
                 "failureThreshold": 5,
@@ -694,12 +1163,9 @@ argocd_release = k8s.helm.v3.Release(
                 "timeoutSeconds": 5,
                 "failureThreshold": 5,
             },
+            "metrics": argocd_metrics,
         },
-        "redis": {
-            "resources": {
-                "requests": {"cpu": "5m", "memory": "32Mi"},
-            },
-        },
+        "redis": argocd_profile["redis"],
         "dex": {"enabled": False},
         "notifications": {"enabled": False},
         "applicationSet": {"enabled": False},
@@ -707,6 +1173,34 @@ argocd_release = k8s.helm.v3.Release(
     opts=pulumi.ResourceOptions(provider=k8s_provider),
 )
 
+# ArgoCD metrics scraping (Managed Prometheus)
+# GKE Managed Prometheus scrapes PodMonitoring resources rather than
+# prometheus-operator ServiceMonitors, so each component gets one here.
+argocd_pod_monitorings = {}
+if argocd_profile["metrics"]:
+    for component in ["application-controller", "repo-server", "server"]:
+        argocd_pod_monitorings[component] = k8s.apiextensions.CustomResource(
+            f"argocd-{component}-metrics",
+            api_version="monitoring.googleapis.com/v1",
+            kind="PodMonitoring",
+            metadata={
+                "name": f"argocd-{component}-metrics",
+                "namespace": "argocd",
+            },
+            spec={
+                "selector": {
+                    "matchLabels": {
+                        "app.kubernetes.io/name": f"argocd-{component}",
+                    },
+                },
+                "endpoints": [{"port": "metrics", "interval": "30s"}],
+            },
+            opts=pulumi.ResourceOptions(
+                provider=k8s_provider, depends_on=[argocd_release]
+            ),
+        )
+
+event_driven_image_updates = config.get_bool("event-driven-image-updates") or False
 argocd_image_updater_release = k8s.helm.v3.Release(
     "argocd-image-updater",
     chart="argocd-image-updater",
@@ -719,10 +1213,158 @@ argocd_image_updater_release = k8s.helm.v3.Release(
         "resources": {
             "requests": {"cpu": "5m", "memory": "32Mi"},
         },
+        # With event-driven updates on, registry polling is only a fallback.
+        "extraArgs": ["--interval=15m"] if event_driven_image_updates else [],
     },
     opts=pulumi.ResourceOptions(provider=k8s_provider),
 )
 
+# Event-driven image updates
+# Artifact Registry publishes push notifications to a topic named `gcr`. The
+# image-refresh receiver (image_refresh.py) consumes them and updates the
+# matching staging ArgoCD Application immediately.
+if event_driven_image_updates:
+    registry_notifications_topic = pubsub.Topic(
+        "gcr",
+        name="gcr",
+        project=project,
+    )
+    registry_notifications_publisher = pubsub.TopicIAMMember(
+        "artifact-registry-gcr-publisher",
+        project=project,
+        topic=registry_notifications_topic.name,
+        role="roles/pubsub.publisher",
+        member=f"serviceAccount:service-{project_number}@gcp-sa-artifactregistry.iam.gserviceaccount.com",
+    )
+    image_refresh_subscription = pubsub.Subscription(
+        "image-refresh",
+        name="image-refresh",
+        project=project,
+        topic=registry_notifications_topic.name,
+        ack_deadline_seconds=30,
+        message_retention_duration="3600s",
+        expiration_policy=pubsub.SubscriptionExpirationPolicyArgs(ttl=""),
+    )
+
+    image_refresh_sa = serviceaccount.Account(
+        "image-refresh-sa",
+        account_id="image-refresh-sa",
+        display_name="Image Refresh Receiver",
+        project=project,
+    )
+    image_refresh_wi = serviceaccount.IAMMember(
+        "image-refresh-workload-identity",
+        service_account_id=image_refresh_sa.name,
+        role="roles/iam.workloadIdentityUser",
+        member=f"serviceAccount:{project}.svc.id.goog[argocd/image-refresh]",
+    )
+    image_refresh_subscriber = pubsub.SubscriptionIAMMember(
+        "image-refresh-subscriber",
+        project=project,
+        subscription=image_refresh_subscription.name,
+        role="roles/pubsub.subscriber",
+        member=image_refresh_sa.email.apply(lambda email: f"serviceAccount:{email}"),
+    )
+
+    image_refresh_ksa = k8s.core.v1.ServiceAccount(
+        "image-refresh-ksa",
+        metadata={
+            "name": "image-refresh",
+            "namespace": "argocd",
+            "annotations": {
+                "iam.gke.io/gcp-service-account": image_refresh_sa.email,
+            },
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    image_refresh_role = k8s.rbac.v1.Role(
+        "image-refresh-role",
+        metadata={"name": "image-refresh", "namespace": "argocd"},
+        rules=[
+            {
+                "api_groups": ["argoproj.io"],
+                "resources": ["applications"],
+                "verbs": ["get", "patch"],
+            },
+        ],
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    image_refresh_role_binding = k8s.rbac.v1.RoleBinding(
+        "image-refresh-role-binding",
+        metadata={"name": "image-refresh", "namespace": "argocd"},
+        role_ref={
+            "api_group": "rbac.authorization.k8s.io",
+            "kind": "Role",
+            "name": "image-refresh",
+        },
+        subjects=[
+            {"kind": "ServiceAccount", "name": "image-refresh", "namespace": "argocd"},
+        ],
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+
+    image_refresh_script = pathlib.Path("image_refresh.py").read_text()
+    image_refresh_config = k8s.core.v1.ConfigMap(
+        "image-refresh-script",
+        metadata={"name": "image-refresh-script", "namespace": "argocd"},
+        data={"image_refresh.py": image_refresh_script},
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    image_refresh_deployment = k8s.apps.v1.Deployment(
+        "image-refresh",
+        metadata={"name": "image-refresh", "namespace": "argocd"},
+        spec={
+            "replicas": 1,
+            "selector": {"match_labels": {"app": "image-refresh"}},
+            "template": {
+                "metadata": {
+                    "labels": {"app": "image-refresh"},
+                    "annotations": {
+                        # Roll the pod whenever the receiver script changes.
+                        "checksum/script": hashlib.sha256(
+                            image_refresh_script.encode()
+                        ).hexdigest(),
+                    },
+                },
+                "spec": {
+                    "service_account_name": "image-refresh",
+                    "containers": [
+                        {
+                            "name": "image-refresh",
+                            # The receiver only uses the standard library: it
+                            # calls the Pub/Sub and Kubernetes REST APIs
+                            # directly, so no gcloud or kubectl is needed.
+                            "image": "python:3.13-slim",
+                            "command": [
+                                "python3",
+                                "/app/image_refresh.py",
+                                "--subscription",
+                                f"projects/{project}/subscriptions/image-refresh",
+                            ],
+                            "resources": {
+                                "requests": {"cpu": "5m", "memory": "64Mi"},
+                                "limits": {"memory": "256Mi"},
+                            },
+                            "volume_mounts": [
+                                {"name": "script", "mount_path": "/app"},
+                            ],
+                        },
+                    ],
+                    "volumes": [
+                        {
+                            "name": "script",
+                            "config_map": {"name": "image-refresh-script"},
+                        },
+                    ],
+                },
+            },
+        },
+        opts=pulumi.ResourceOptions(
+            provider=k8s_provider,
+            depends_on=[image_refresh_subscriber, image_refresh_wi],
+        ),
+    )
+
 # Secrets Store CSI Driver (Helm)
 csi_secrets_store_release = k8s.helm.v3.Release(
     "csi-secrets-store",
@@ -734,6 +1376,8 @@ csi_secrets_store_release = k8s.helm.v3.Release(
     ),
     values={
         "syncSecret": {"enabled": True},
+        "enableSecretRotation": secret_rotation_interval is not None,
+        "rotationPollInterval": secret_rotation_interval or "2m",
     },
     opts=pulumi.ResourceOptions(provider=k8s_provider),
 )
@@ -759,6 +1403,988 @@ tailscale_operator_release = k8s.helm.v3.Release(
     opts=pulumi.ResourceOptions(provider=k8s_provider),
 )
 
+# Overprovisioning
+# Low-priority "balloon" pods hold spare capacity on each configured pool, so
+# new replicas and pods rescheduled after spot preemption start immediately
+# by evicting them; the autoscaler then adds a node for the balloons in the
+# background. Configured per pool via the `overprovisioning` config object:
+#   {"spot-pool-medium": {"replicas": 1, "cpu": "500m", "memory": "512Mi"}}
+# Pools listed here should also have an entry in `node-pool-autoscaling`.
+overprovisioning_settings = config.get_object("overprovisioning") or {}
+overprovisioning_deployments = {}
+if overprovisioning_settings:
+    overprovisioning_namespace = k8s.core.v1.Namespace(
+        "overprovisioning",
+        metadata={"name": "overprovisioning"},
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    overprovisioning_priority_class = k8s.scheduling.v1.PriorityClass(
+        "overprovisioning",
+        metadata={"name": "overprovisioning"},
+        value=-10,
+        preemption_policy="Never",
+        global_default=False,
+        description="Placeholder pods that reserve headroom; evicted by any real workload.",
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    for pool, settings in overprovisioning_settings.items():
+        overprovisioning_deployments[pool] = k8s.apps.v1.Deployment(
+            f"overprovisioning-{pool}",
+            metadata={"name": f"balloon-{pool}", "namespace": "overprovisioning"},
+            spec={
+                "replicas": settings.get("replicas", 1),
+                "selector": {"match_labels": {"app": f"balloon-{pool}"}},
+                "template": {
+                    "metadata": {"labels": {"app": f"balloon-{pool}"}},
+                    "spec": {
+                        "priority_class_name": "overprovisioning",
+                        "termination_grace_period_seconds": 0,
+                        "node_selector": {"cloud.google.com/gke-nodepool": pool},
+                        "tolerations": settings.get("tolerations", []),
+                        "containers": [
+                            {
+                                "name": "pause",
+                                "image": "registry.k8s.io/pause:3.10",
+                                "resources": {
+                                    "requests": {
+                                        "cpu": settings.get("cpu", "500m"),
+                                        "memory": settings.get("memory", "512Mi"),
+                                    },
+                                },
+                            },
+                        ],
+                    },
+                },
+            },
+            opts=pulumi.ResourceOptions(
+                provider=k8s_provider,
+                depends_on=[
+                    overprovisioning_namespace,
+                    overprovisioning_priority_class,
+                ],
+            ),
+        )
+
+# PgBouncer connection pooling
+# Opt-in per service environment via the `pgbouncer` config object, e.g.
+#   {"fitness-api-prod": {"pool_size": 20, "max_client_conn": 200}}
+# Each pooler runs in transaction mode in the environment's namespace and
+# reads its upstream DATABASE_URL from Secret Manager through the CSI driver.
+# Apps connect to `pgbouncer.<namespace>.svc:5432` with the same credentials.
+pgbouncer_settings = config.get_object("pgbouncer") or {}
+pgbouncer_deployments = {}
+for env_key, settings in pgbouncer_settings.items():
+    if env_key not in secret_access:
+        raise ValueError(f"Unknown pgbouncer environment '{env_key}'")
+    _, env_secrets = secret_access[env_key]
+    database_url_secret = next(
+        name for name in env_secrets if name.endswith("_database_url")
+    )
+    k8s.apiextensions.CustomResource(
+        f"{env_key}-pgbouncer-secrets",
+        api_version="secrets-store.csi.x-k8s.io/v1",
+        kind="SecretProviderClass",
+        metadata={"name": "pgbouncer", "namespace": env_key},
+        spec={
+            "provider": "gcp",
+            "parameters": {
+                "secrets": (
+                    f'- resourceName: "projects/{project}/secrets/'
+                    f'{database_url_secret}/versions/latest"\n'
+                    '  path: "database_url"\n'
+                ),
+            },
+            "secretObjects": [
+                {
+                    "secretName": "pgbouncer",
+                    "type": "Opaque",
+                    "data": [{"objectName": "database_url", "key": "DATABASE_URL"}],
+                },
+            ],
+        },
+        opts=pulumi.ResourceOptions(
+            provider=k8s_provider, depends_on=[csi_secrets_store_release]
+        ),
+    )
+    pgbouncer_deployments[env_key] = k8s.apps.v1.Deployment(
+        f"{env_key}-pgbouncer",
+        metadata={"name": "pgbouncer", "namespace": env_key},
+        spec={
+            "replicas": settings.get("replicas", 1),
+            "selector": {"match_labels": {"app": "pgbouncer"}},
+            "template": {
+                "metadata": {"labels": {"app": "pgbouncer"}},
+                "spec": {
+                    # The app's KSA is already bound to its GSA via Workload
+                    # Identity and can read the database URL secret.
+                    "service_account_name": f"{env_key}-ksa",
+                    "containers": [
+                        {
+                            "name": "pgbouncer",
+                            "image": "edoburu/pgbouncer:v1.24.1-p1",
+                            "ports": [{"name": "postgres", "container_port": 5432}],
+                            "env": [
+                                {
+                                    "name": "DATABASE_URL",
+                                    "value_from": {
+                                        "secret_key_ref": {
+                                            "name": "pgbouncer",
+                                            "key": "DATABASE_URL",
+                                        },
+                                    },
+                                },
+                                {"name": "POOL_MODE", "value": "transaction"},
+                                {"name": "AUTH_TYPE", "value": "scram-sha-256"},
+                                {
+                                    "name": "DEFAULT_POOL_SIZE",
+                                    "value": str(settings.get("pool_size", 10)),
+                                },
+                                {
+                                    "name": "MAX_CLIENT_CONN",
+                                    "value": str(settings.get("max_client_conn", 100)),
+                                },
+                            ],
+                            "readiness_probe": {
+                                "tcp_socket": {"port": 5432},
+                                "period_seconds": 5,
+                            },
+                            "resources": {
+                                "requests": {"cpu": "10m", "memory": "16Mi"},
+                                "limits": {"memory": "64Mi"},
+                            },
+                            "volume_mounts": [
+                                {
+                                    "name": "secrets",
+                                    "mount_path": "/var/secrets",
+                                    "read_only": True,
+                                },
+                            ],
+                        },
+                    ],
+                    # Mounting the CSI volume is what syncs the `pgbouncer` Secret.
+                    "volumes": [
+                        {
+                            "name": "secrets",
+                            "csi": {
+                                "driver": "secrets-store.csi.k8s.io",
+                                "read_only": True,
+                                "volume_attributes": {
+                                    "secretProviderClass": "pgbouncer"
+                                },
+                            },
+                        },
+                    ],
+                },
+            },
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    k8s.core.v1.Service(
+        f"{env_key}-pgbouncer-service",
+        metadata={"name": "pgbouncer", "namespace": env_key},
+        spec={
+            "selector": {"app": "pgbouncer"},
+            "ports": [{"name": "postgres", "port": 5432, "target_port": "postgres"}],
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+
+# Workload patches
+# App manifests live in each service's repo, so scheduling policy declared
+# here is applied as a kustomize patch on the service's ArgoCD Applications.
+# Patch ops are collected per Application and applied as one
+# CustomResourcePatch each, so every Deployment in the app picks them up.
+argocd_services = [
+    "fitness-api",
+    "fitness-dashboard",
+    "identity",
+    "asset-manager",
+    "forecasting",
+]
+deployment_patch_ops = {
+    f"{service}-{env}": [] for service in argocd_services for env in ["staging", "prod"]
+}
+
+# Service placement: maps services to dedicated node classes via the
+# `service-placement` config object, e.g. {"forecasting": "compute"}.
+service_placement = config.get_object("service-placement") or {}
+for service, node_class in service_placement.items():
+    if node_class != "compute":
+        raise ValueError(f"Unknown node class '{node_class}' for {service}")
+    if not compute_pool_settings:
+        raise ValueError(f"{service} is placed on the compute pool, which is disabled")
+    for env in ["staging", "prod"]:
+        deployment_patch_ops[f"{service}-{env}"] += [
+            {
+                "op": "add",
+                "path": "/spec/template/spec/nodeSelector",
+                "value": {compute_pool_taint["key"]: compute_pool_taint["value"]},
+            },
+            {
+                "op": "add",
+                "path": "/spec/template/spec/tolerations",
+                "value": [
+                    {
+                        **compute_pool_taint,
+                        "operator": "Equal",
+                        "effect": "NoSchedule",
+                    },
+                ],
+            },
+        ]
+
+# Spot preemption resilience for prod, selected with `prod-spot-resilience`:
+#   "prefer-on-demand": prod pods prefer the on-demand pool, but fall back to
+#     spot nodes while it is full (and vice versa when spot capacity is gone).
+#   "spread": prod replicas are spread across node pools so one preemption
+#     can't take every replica down.
+# Either mode also gives staging pods the `staging-services` PriorityClass,
+# which sits below the default priority, so prod pods (at the default via
+# `prod-services`) preempt staging pods on default-pool-std2 when spot
+# capacity disappears. Infra workloads without a class (ArgoCD, PgBouncer,
+# the Tailscale operator, image-refresh, the blackbox exporter) share prod's
+# priority and are never preempted by it; only staging and overprovisioning
+# pods are.
+prod_spot_resilience = config.get("prod-spot-resilience")
+if prod_spot_resilience not in (None, "prefer-on-demand", "spread"):
+    raise ValueError(
+        f"Unknown prod-spot-resilience '{prod_spot_resilience}' "
+        "(expected one of: prefer-on-demand, spread)"
+    )
+
+# Topology spread: with `topology-spread` enabled, replicas of each Deployment
+# are spread across zones and nodes (best effort, so single-zone pools still
+# schedule). matchLabelKeys scopes the spread to one ReplicaSet revision.
+topology_spread = config.get_bool("topology-spread") or False
+for argocd_app, ops in deployment_patch_ops.items():
+    is_prod = argocd_app.endswith("-prod")
+    topology_keys = []
+    if topology_spread:
+        topology_keys += ["topology.kubernetes.io/zone", "kubernetes.io/hostname"]
+    if is_prod and prod_spot_resilience == "spread":
+        topology_keys.append("cloud.google.com/gke-nodepool")
+    if topology_keys:
+        ops.append(
+            {
+                "op": "add",
+                "path": "/spec/template/spec/topologySpreadConstraints",
+                "value": [
+                    {
+                        "maxSkew": 1,
+                        "topologyKey": topology_key,
+                        "whenUnsatisfiable": "ScheduleAnyway",
+                        "labelSelector": {},
+                        "matchLabelKeys": ["pod-template-hash"],
+                    }
+                    for topology_key in topology_keys
+                ],
+            }
+        )
+    if prod_spot_resilience is not None:
+        ops.append(
+            {
+                "op": "add",
+                "path": "/spec/template/spec/priorityClassName",
+                "value": "prod-services" if is_prod else "staging-services",
+            }
+        )
+    if is_prod and prod_spot_resilience == "prefer-on-demand":
+        ops.append(
+            {
+                "op": "add",
+                "path": "/spec/template/spec/affinity",
+                "value": {
+                    "nodeAffinity": {
+                        "preferredDuringSchedulingIgnoredDuringExecution": [
+                            {
+                                "weight": 100,
+                                "preference": {
+                                    "matchExpressions": [
+                                        {
+                                            "key": "cloud.google.com/gke-spot",
+                                            "operator": "DoesNotExist",
+                                        },
+                                    ],
+                                },
+                            },
+                        ],
+                    },
+                },
+            }
+        )
+
+service_priority_classes = []
+if prod_spot_resilience is not None:
+    # Both sit between the overprovisioning balloons (-10) and the default
+    # priority (0) that infra workloads run at.
+    service_priority_classes = [
+        k8s.scheduling.v1.PriorityClass(
+            "prod-services",
+            metadata={"name": "prod-services"},
+            value=0,
+            global_default=False,
+            description="Prod service pods; preempt staging and placeholder pods.",
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        ),
+        k8s.scheduling.v1.PriorityClass(
+            "staging-services",
+            metadata={"name": "staging-services"},
+            value=-5,
+            global_default=False,
+            description="Staging service pods; preempted by prod and infra pods.",
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        ),
+    ]
+    # Limit how many of each prod app's pods can be down at once through node
+    # drains, upgrades and autoscaler scale-down (0 blocks voluntary
+    # disruptions). Spot preemption itself bypasses PDBs, which is what the
+    # affinity/spread settings above address. Budgets select the app's own
+    # pods via `app-selectors` (default {"app": <service>}), so other pods in
+    # the namespace, like PgBouncer, aren't counted against them.
+    prod_max_unavailable = config.get_int("prod-max-unavailable")
+    if prod_max_unavailable is None:
+        prod_max_unavailable = 1
+    app_selectors = config.get_object("app-selectors") or {}
+    prod_pdbs = {}
+    for service in argocd_services:
+        namespace = f"{service}-prod"
+        prod_pdbs[namespace] = k8s.policy.v1.PodDisruptionBudget(
+            f"{namespace}-pdb",
+            metadata={"name": service, "namespace": namespace},
+            spec={
+                "max_unavailable": prod_max_unavailable,
+                "selector": {
+                    "match_labels": app_selectors.get(service, {"app": service}),
+                },
+                "unhealthy_pod_eviction_policy": "AlwaysAllow",
+            },
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        )
+
+deployment_patches = {}
+for argocd_app, ops in deployment_patch_ops.items():
+    if not ops:
+        continue
+    deployment_patches[argocd_app] = k8s.apiextensions.CustomResourcePatch(
+        f"{argocd_app}-deployment-patches",
+        api_version="argoproj.io/v1alpha1",
+        kind="Application",
+        metadata={
+            "name": argocd_app,
+            "namespace": "argocd",
+            "annotations": {"pulumi.com/patchForce": "true"},
+        },
+        spec={
+            "source": {
+                "kustomize": {
+                    "patches": [
+                        {
+                            "target": {"kind": "Deployment"},
+                            "patch": json.dumps(ops),
+                        },
+                    ],
+                },
+            },
+        },
+        opts=pulumi.ResourceOptions(
+            provider=k8s_provider,
+            depends_on=service_priority_classes,
+        ),
+    )
+
+# Service SLO monitoring (Managed Prometheus + Cloud Monitoring)
+# Per-service settings from the `slos` config object, e.g.
+#   {"fitness-api": {"latency_p95_ms": 300, "availability": 0.995}}
+# Optional keys: `port` (container port name, default "metrics"), `metric`
+# (histogram base name, default "http_request_duration_seconds") and
+# `error_selector` (label matcher for failed requests, default 'code=~"5.."').
+# Alerts go to the channels listed in `alert-notification-channels`.
+slo_settings = config.get_object("slos") or {}
+alert_notification_channels = config.get_object("alert-notification-channels") or []
+slo_dashboards = {}
+slo_alert_policies = {}
+
+
+def slo_series(record: str, namespace: str) -> str:
+    """PromQL selector for a recorded SLO series in one namespace."""
+    return f'{record}{{namespace="{namespace}"}}'
+
+
+for service, slo in slo_settings.items():
+    metric = slo.get("metric", "http_request_duration_seconds")
+    error_selector = slo.get("error_selector", 'code=~"5.."')
+    error_budget = 1 - slo.get("availability", 0.995)
+    latency_p95_seconds = slo["latency_p95_ms"] / 1000
+    prod_namespace = f"{service}-prod"
+
+    for env in ["staging", "prod"]:
+        namespace = f"{service}-{env}"
+        k8s.apiextensions.CustomResource(
+            f"{namespace}-pod-monitoring",
+            api_version="monitoring.googleapis.com/v1",
+            kind="PodMonitoring",
+            metadata={"name": service, "namespace": namespace},
+            spec={
+                "selector": {},
+                "endpoints": [
+                    {"port": slo.get("port", "metrics"), "interval": "30s"},
+                ],
+            },
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        )
+        k8s.apiextensions.CustomResource(
+            f"{namespace}-slo-rules",
+            api_version="monitoring.googleapis.com/v1",
+            kind="Rules",
+            metadata={"name": f"{service}-slo", "namespace": namespace},
+            spec={
+                "groups": [
+                    {
+                        "name": f"{service}-slo",
+                        "interval": "30s",
+                        "rules": [
+                            {
+                                "record": "service:requests:rate5m",
+                                "expr": f"sum(rate({metric}_count[5m]))",
+                            },
+                            {
+                                "record": "service:errors:ratio_rate5m",
+                                "expr": (
+                                    f"sum(rate({metric}_count{{{error_selector}}}[5m]))"
+                                    f" / sum(rate({metric}_count[5m]))"
+                                ),
+                            },
+                            {
+                                "record": "service:errors:ratio_rate1h",
+                                "expr": (
+                                    f"sum(rate({metric}_count{{{error_selector}}}[1h]))"
+                                    f" / sum(rate({metric}_count[1h]))"
+                                ),
+                            },
+                            *[
+                                {
+                                    "record": f"service:latency_seconds:p{quantile}_5m",
+                                    "expr": (
+                                        f"histogram_quantile(0.{quantile}, "
+                                        f"sum by (le) (rate({metric}_bucket[5m])))"
+                                    ),
+                                }
+                                for quantile in [50, 95, 99]
+                            ],
+                        ],
+                    },
+                ],
+            },
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        )
+
+    slo_dashboards[service] = monitoring.Dashboard(
+        f"{service}-slo-dashboard",
+        project=project,
+        dashboard_json=json.dumps(
+            {
+                "displayName": f"{service} SLOs",
+                "gridLayout": {
+                    "columns": "2",
+                    "widgets": [
+                        {
+                            "title": f"{title} ({env})",
+                            "xyChart": {
+                                "dataSets": [
+                                    {
+                                        "timeSeriesQuery": {
+                                            "prometheusQuery": slo_series(
+                                                record, f"{service}-{env}"
+                                            ),
+                                        },
+                                        "legendTemplate": legend,
+                                        "plotType": "LINE",
+                                    }
+                                    for record, legend in records
+                                ],
+                            },
+                        }
+                        for env in ["prod", "staging"]
+                        for title, records in [
+                            (
+                                "Request rate",
+                                [("service:requests:rate5m", "req/s")],
+                            ),
+                            (
+                                "Latency",
+                                [
+                                    (f"service:latency_seconds:p{q}_5m", f"p{q}")
+                                    for q in [50, 95, 99]
+                                ],
+                            ),
+                            (
+                                "Error ratio",
+                                [("service:errors:ratio_rate5m", "errors")],
+                            ),
+                        ]
+                    ],
+                },
+            }
+        ),
+    )
+
+    # Multiwindow burn-rate alert: page when the 1h and 5m error ratios both
+    # burn the monthly error budget at 14.4x (2% of budget in an hour).
+    slo_alert_policies[f"{service}-burn-rate"] = monitoring.AlertPolicy(
+        f"{service}-burn-rate",
+        project=project,
+        display_name=f"{service} prod error budget burn",
+        combiner="OR",
+        conditions=[
+            monitoring.AlertPolicyConditionArgs(
+                display_name="Error budget burn rate > 14.4x",
+                condition_prometheus_query_language=monitoring.AlertPolicyConditionConditionPrometheusQueryLanguageArgs(
+                    query=(
+                        f"{slo_series('service:errors:ratio_rate1h', prod_namespace)} > "
+                        f"{14.4 * error_budget:g} and "
+                        f"{slo_series('service:errors:ratio_rate5m', prod_namespace)} > "
+                        f"{14.4 * error_budget:g}"
+                    ),
+                    duration="120s",
+                    evaluation_interval="60s",
+                ),
+            ),
+        ],
+        notification_channels=alert_notification_channels,
+    )
+    slo_alert_policies[f"{service}-latency"] = monitoring.AlertPolicy(
+        f"{service}-latency",
+        project=project,
+        display_name=f"{service} prod p95 latency",
+        combiner="OR",
+        conditions=[
+            monitoring.AlertPolicyConditionArgs(
+                display_name=f"p95 latency > {slo['latency_p95_ms']}ms",
+                condition_prometheus_query_language=monitoring.AlertPolicyConditionConditionPrometheusQueryLanguageArgs(
+                    query=(
+                        f"{slo_series('service:latency_seconds:p95_5m', prod_namespace)} > "
+                        f"{latency_p95_seconds:g}"
+                    ),
+                    duration="600s",
+                    evaluation_interval="60s",
+                ),
+            ),
+        ],
+        notification_channels=alert_notification_channels,
+    )
+
+# Synthetic latency probes
+# A blackbox exporter probes each service's endpoints from inside the cluster
+# on every scrape, for both environments. Targets come from the `probes`
+# config object, e.g.
+#   {"fitness-api": {"service": "fitness-api", "port": 80,
+#                    "paths": ["/health", "/api/activities"]}}
+# Blackbox reports a per-probe duration gauge, so p95 is recorded over a
+# short rolling window with quantile_over_time; `deploy status` reads that
+# series. The window is kept short so the number shown right after a staging
+# rollout reflects the new build rather than the previous one.
+probe_settings = config.get_object("probes") or {}
+probe_interval = config.get("probe-interval") or "30s"
+probe_window = "10m"
+probe_interval_match = re.fullmatch(r"(\d+)(s|m)", probe_interval)
+if probe_interval_match is None:
+    raise ValueError(f"probe-interval must look like 30s or 1m, got '{probe_interval}'")
+probe_interval_seconds = int(probe_interval_match[1]) * (
+    60 if probe_interval_match[2] == "m" else 1
+)
+if probe_interval_seconds < 2:
+    raise ValueError("probe-interval must be at least 2s")
+# Scrape timeouts must fit inside the interval; blackbox itself gives up
+# just before the scrape timeout.
+probe_timeout = f"{min(10, probe_interval_seconds * 4 // 5)}s"
+if probe_settings:
+    blackbox_exporter_release = k8s.helm.v3.Release(
+        "blackbox-exporter",
+        chart="prometheus-blackbox-exporter",
+        version="11.4.1",
+        namespace="probes",
+        create_namespace=True,
+        repository_opts=k8s.helm.v3.RepositoryOptsArgs(
+            repo="https://prometheus-community.github.io/helm-charts",
+        ),
+        values={
+            "resources": {
+                "requests": {"cpu": "5m", "memory": "32Mi"},
+                "limits": {"memory": "64Mi"},
+            },
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    # One PodMonitoring per target: endpoints within a PodMonitoring share its
+    # job and instance labels, so targets listed together would collide.
+    probe_monitors = {}
+    for service, probe in probe_settings.items():
+        for env in ["staging", "prod"]:
+            host = f"{probe['service']}.{service}-{env}.svc.cluster.local"
+            for path in probe.get("paths", ["/health"]):
+                path_slug = re.sub(r"[^a-z0-9]+", "-", path.lower()).strip("-")
+                name = f"probe-{service}-{env}-{path_slug or 'root'}"[:63].rstrip("-")
+                if name in probe_monitors:
+                    raise ValueError(f"Probe paths for '{service}' collide as '{name}'")
+                probe_monitors[name] = k8s.apiextensions.CustomResource(
+                    name,
+                    api_version="monitoring.googleapis.com/v1",
+                    kind="PodMonitoring",
+                    metadata={"name": name, "namespace": "probes"},
+                    spec={
+                        "selector": {
+                            "matchLabels": {
+                                "app.kubernetes.io/name": "prometheus-blackbox-exporter",
+                            },
+                        },
+                        "endpoints": [
+                            {
+                                "port": "http",
+                                "path": "/probe",
+                                "interval": probe_interval,
+                                "timeout": probe_timeout,
+                                "params": {
+                                    "module": ["http_2xx"],
+                                    "target": [
+                                        f"http://{host}:{probe.get('port', 80)}{path}"
+                                    ],
+                                },
+                                "metricRelabeling": [
+                                    {
+                                        "action": "replace",
+                                        "targetLabel": label,
+                                        "replacement": value,
+                                    }
+                                    for label, value in [
+                                        ("probe_service", service),
+                                        ("probe_env", env),
+                                        ("probe_path", path),
+                                    ]
+                                ],
+                            },
+                        ],
+                    },
+                    opts=pulumi.ResourceOptions(
+                        provider=k8s_provider, depends_on=[blackbox_exporter_release]
+                    ),
+                )
+    k8s.apiextensions.CustomResource(
+        "blackbox-probe-rules",
+        api_version="monitoring.googleapis.com/v1",
+        kind="Rules",
+        metadata={"name": "blackbox-probes", "namespace": "probes"},
+        spec={
+            "groups": [
+                {
+                    "name": "probes",
+                    "interval": "60s",
+                    "rules": [
+                        {
+                            "record": f"probe:duration_seconds:p{quantile}_{probe_window}",
+                            "expr": (
+                                f"quantile_over_time(0.{quantile}, "
+                                f"probe_duration_seconds[{probe_window}])"
+                            ),
+                        }
+                        for quantile in [50, 95, 99]
+                    ],
+                },
+            ],
+        },
+        opts=pulumi.ResourceOptions(
+            provider=k8s_provider, depends_on=[blackbox_exporter_release]
+        ),
+    )
+
+# Workload log volume controls
+# Per-service Cloud Logging rules from the `log-controls` config object, e.g.
+#   {"fitness-api": {"info_sample_rate": 0.1, "drop_health_checks": true,
+#                    "debug_to_storage": true},
+#    "argocd": {"info_sample_rate": 0.05}}
+# Service keys cover both the staging and prod namespaces; any other key is
+# treated as a namespace. Exclusions apply to the _Default sink only, so
+# debug logs routed to the archive bucket are still kept there.
+log_controls = config.get_object("log-controls") or {}
+# Health check requests: the request path must be exactly one of these
+# endpoints (optionally with a query string), and only INFO-and-below lines
+# are dropped so failed health checks stay visible. `[?]` avoids escaping.
+health_check_path = "/(healthz?|readyz|livez|ping)([?][^ ]*)?"
+health_check_url = f"^(https?://[^/]+)?{health_check_path}$"
+# Access-log lines such as `GET /healthz HTTP/1.1`.
+health_check_access_log = f"^(GET|HEAD) {health_check_path} HTTP/"
+log_exclusions = {}
+log_archive_sinks = {}
+log_archive_bucket = None
+if any(rules.get("debug_to_storage") for rules in log_controls.values()):
+    log_archive_bucket = storage.Bucket(
+        "workload-debug-logs",
+        name=f"{project}-workload-debug-logs",
+        location=region,
+        project=project,
+        storage_class="COLDLINE",
+        uniform_bucket_level_access=True,
+        lifecycle_rules=[
+            storage.BucketLifecycleRuleArgs(
+                action=storage.BucketLifecycleRuleActionArgs(type="Delete"),
+                condition=storage.BucketLifecycleRuleConditionArgs(age=30),
+            ),
+        ],
+    )
+for key, rules in log_controls.items():
+    if key in argocd_services:
+        namespaces = [f"{key}-staging", f"{key}-prod"]
+    else:
+        namespaces = [key]
+    namespace_list = " OR ".join(f'"{ns}"' for ns in namespaces)
+    base_filter = (
+        'resource.type="k8s_container" AND '
+        f"resource.labels.namespace_name=({namespace_list})"
+    )
+
+    if rules.get("drop_health_checks"):
+        log_exclusions[f"{key}-health-checks"] = logging.ProjectExclusion(
+            f"{key}-health-checks",
+            name=f"{key}-health-checks",
+            project=project,
+            description=f"Drop health check request logs for {key}",
+            filter=(
+                f"{base_filter} AND severity<=INFO AND ("
+                f'httpRequest.requestUrl=~"{health_check_url}" OR '
+                f'jsonPayload.message=~"{health_check_access_log}" OR '
+                f'textPayload=~"{health_check_access_log}")'
+            ),
+        )
+
+    if "info_sample_rate" in rules:
+        # Exclude everything outside the sample, keeping `info_sample_rate`.
+        log_exclusions[f"{key}-info-sampling"] = logging.ProjectExclusion(
+            f"{key}-info-sampling",
+            name=f"{key}-info-sampling",
+            project=project,
+            description=f"Keep {rules['info_sample_rate']:.0%} of INFO logs for {key}",
+            filter=(
+                f"{base_filter} AND severity=INFO AND "
+                f"NOT sample(insertId, {rules['info_sample_rate']})"
+            ),
+        )
+
+    if rules.get("debug_to_storage") and log_archive_bucket is not None:
+        debug_filter = f"{base_filter} AND severity=DEBUG"
+        log_archive_sinks[key] = logging.ProjectSink(
+            f"{key}-debug-archive",
+            name=f"{key}-debug-archive",
+            project=project,
+            destination=log_archive_bucket.name.apply(
+                lambda name: f"storage.googleapis.com/{name}"
+            ),
+            filter=debug_filter,
+            unique_writer_identity=True,
+        )
+        storage.BucketIAMMember(
+            f"{key}-debug-archive-writer",
+            bucket=log_archive_bucket.name,
+            role="roles/storage.objectCreator",
+            member=log_archive_sinks[key].writer_identity,
+        )
+        log_exclusions[f"{key}-debug"] = logging.ProjectExclusion(
+            f"{key}-debug",
+            name=f"{key}-debug",
+            project=project,
+            description=f"Debug logs for {key} are archived to Cloud Storage",
+            filter=debug_filter,
+        )
+
+# Public Gateway (Gateway API) with Cloud CDN
+# A global external Application Load Balancer terminating TLS with Certificate
+# Manager certs and serving HTTP/2 to clients. Static-asset routes get a
+# Cache-Control header per route, and backends with a `cdn` entry are cached
+# by Cloud CDN through a GCPBackendPolicy.
+public_gateway = None
+if public_services:
+    public_gateway_ip = compute.GlobalAddress(
+        "public-gateway-ip",
+        name="public-gateway-ip",
+        project=project,
+    )
+    public_certificate_map = certificatemanager.CertificateMap(
+        "public-gateway",
+        name="public-gateway",
+        project=project,
+    )
+    for namespace, settings in public_services.items():
+        hostname = settings["hostname"]
+        certificate = certificatemanager.Certificate(
+            f"{namespace}-cert",
+            name=f"{namespace}-cert",
+            project=project,
+            managed=certificatemanager.CertificateManagedArgs(
+                domains=[hostname],
+            ),
+        )
+        certificatemanager.CertificateMapEntry(
+            f"{namespace}-cert-entry",
+            name=f"{namespace}-cert-entry",
+            project=project,
+            map=public_certificate_map.name,
+            hostname=hostname,
+            certificates=[certificate.id],
+        )
+
+    public_gateway_namespace = k8s.core.v1.Namespace(
+        "gateway",
+        metadata={"name": "gateway"},
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+    public_gateway = k8s.apiextensions.CustomResource(
+        "public-gateway",
+        api_version="gateway.networking.k8s.io/v1",
+        kind="Gateway",
+        metadata={
+            "name": "public",
+            "namespace": "gateway",
+            "annotations": {"networking.gke.io/certmap": "public-gateway"},
+        },
+        spec={
+            "gatewayClassName": "gke-l7-global-external-managed",
+            "listeners": [
+                {
+                    "name": "https",
+                    "protocol": "HTTPS",
+                    "port": 443,
+                    "allowedRoutes": {"namespaces": {"from": "All"}},
+                },
+            ],
+            "addresses": [
+                {"type": "NamedAddress", "value": public_gateway_ip.name},
+            ],
+        },
+        opts=pulumi.ResourceOptions(
+            provider=k8s_provider,
+            depends_on=[public_gateway_namespace, main_cluster],
+        ),
+    )
+
+    def cdn_policy(name: str, namespace: str, service: str, cdn: dict) -> None:
+        """Enable Cloud CDN on the backend for one Kubernetes Service."""
+        k8s.apiextensions.CustomResource(
+            name,
+            api_version="networking.gke.io/v1",
+            kind="GCPBackendPolicy",
+            metadata={"name": service, "namespace": namespace},
+            spec={
+                "default": {
+                    "cdn": {
+                        "enabled": True,
+                        "cacheMode": "CACHE_ALL_STATIC",
+                        "defaultTtl": cdn.get("default_ttl", 3600),
+                        "maxTtl": cdn.get("max_ttl", 86400),
+                        "clientTtl": cdn.get("client_ttl", 3600),
+                        "negativeCaching": True,
+                        "cachePolicy": {
+                            "includeHost": True,
+                            "includeProtocol": False,
+                            "includeQueryString": cdn.get(
+                                "include_query_string", False
+                            ),
+                        },
+                    },
+                },
+                "targetRef": {"group": "", "kind": "Service", "name": service},
+            },
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        )
+
+    for namespace, settings in public_services.items():
+        backend_ref = {"name": settings["service"], "port": settings["port"]}
+        rules = []
+        for index, route in enumerate(settings.get("routes", [])):
+            route_backend_ref = backend_ref
+            route_cdn = route.get("cdn")
+            if route_cdn is not None:
+                # Cloud CDN settings apply per backend, so a route with its
+                # own cache key/TTLs gets a dedicated Service (and therefore
+                # its own load balancer backend) selecting the same pods.
+                if "selector" not in settings:
+                    raise ValueError(
+                        f"{namespace}: routes with their own cdn settings "
+                        "need the service's pod `selector`"
+                    )
+                route_service = f"{settings['service']}-cdn-{index}"
+                k8s.core.v1.Service(
+                    f"{namespace}-{route_service}",
+                    metadata={"name": route_service, "namespace": namespace},
+                    spec={
+                        "selector": settings["selector"],
+                        "ports": [
+                            {
+                                "port": settings["port"],
+                                "target_port": settings.get(
+                                    "target_port", settings["port"]
+                                ),
+                            },
+                        ],
+                    },
+                    opts=pulumi.ResourceOptions(provider=k8s_provider),
+                )
+                cdn_policy(
+                    f"{namespace}-{route_service}-backend-policy",
+                    namespace,
+                    route_service,
+                    route_cdn,
+                )
+                route_backend_ref = {"name": route_service, "port": settings["port"]}
+            rules.append(
+                {
+                    "matches": [
+                        {"path": {"type": "PathPrefix", "value": route["path"]}},
+                    ],
+                    "filters": [
+                        {
+                            "type": "ResponseHeaderModifier",
+                            "responseHeaderModifier": {
+                                "set": [
+                                    {
+                                        "name": "Cache-Control",
+                                        "value": f"public, max-age={route['cache_max_age']}",
+                                    },
+                                ],
+                            },
+                        },
+                    ]
+                    if "cache_max_age" in route
+                    else [],
+                    "backendRefs": [route_backend_ref],
+                }
+            )
+        rules.append(
+            {
+                "matches": [{"path": {"type": "PathPrefix", "value": "/"}}],
+                "backendRefs": [backend_ref],
+            }
+        )
+        k8s.apiextensions.CustomResource(
+            f"{namespace}-route",
+            api_version="gateway.networking.k8s.io/v1",
+            kind="HTTPRoute",
+            metadata={"name": "public", "namespace": namespace},
+            spec={
+                "parentRefs": [{"name": "public", "namespace": "gateway"}],
+                "hostnames": [settings["hostname"]],
+                "rules": rules,
+            },
+            opts=pulumi.ResourceOptions(
+                provider=k8s_provider, depends_on=[public_gateway]
+            ),
+        )
+
+        if "cdn" in settings:
+            cdn_policy(
+                f"{namespace}-backend-policy",
+                namespace,
+                settings["service"],
+                settings["cdn"],
+            )
+
 # Export cluster info
 pulumi.export("cluster_name", main_cluster.name)
 pulumi.export("cluster_endpoint", main_cluster.endpoint)
@@ -768,3 +2394,5 @@ pulumi.export(
         lambda id: f"{region}-docker.pkg.dev/{project}/containers"
     ),
 )
+if public_services:
+    pulumi.export("public_gateway_ip", public_gateway_ip.address)
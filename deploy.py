@@ -14,8 +14,14 @@ import json
 import subprocess
 import sys
 import re
+import urllib.parse
+import urllib.request
 
 REGISTRY = "us-central1-docker.pkg.dev/ethans-services/containers"
+PROMETHEUS_QUERY_URL = (
+    "https://monitoring.googleapis.com/v1/projects/ethans-services"
+    "/location/global/prometheus/api/v1/query"
+)
 
 
 def run(cmd: list[str]) -> str:
@@ -50,6 +56,44 @@ def get_deployed_images(namespace: str) -> set[str]:
         return set()
 
 
+def get_probe_p95(app: str) -> dict[str, float]:
+    """Get the last 10 minutes' p95 probe latency (seconds) per environment.
+
+    Returns an empty dict if the app has no probes, gcloud is unavailable,
+    or the query fails.
+    """
+    try:
+        token = run(["gcloud", "auth", "print-access-token"])
+    except (SystemExit, OSError):
+        return {}
+    # One series per environment: probes of several paths are combined by
+    # taking the slowest.
+    query = (
+        f'max by (probe_env) (probe:duration_seconds:p95_10m{{probe_service="{app}"}})'
+    )
+    request = urllib.request.Request(
+        f"{PROMETHEUS_QUERY_URL}?{urllib.parse.urlencode({'query': query})}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            body = json.load(response)
+    except (OSError, ValueError):
+        return {}
+    return {
+        result["metric"]["probe_env"]: float(result["value"][1])
+        for result in body.get("data", {}).get("result", [])
+        if "probe_env" in result["metric"]
+    }
+
+
+def format_latency(p95: dict[str, float], env: str) -> str:
+    """Format an environment's p95 latency for display, or '' if unknown."""
+    if env not in p95:
+        return ""
+    return f"  (p95 {p95[env] * 1000:.0f}ms)"
+
+
 def extract_tag(image: str) -> str:
     """Extract the tag from a full image URL."""
     if ":" in image:
@@ -74,6 +118,7 @@ def status(app: str) -> None:
     """Show current deployment status for an app."""
     staging_images = get_deployed_images(f"{app}-staging")
     prod_images = get_deployed_images(f"{app}-prod")
+    p95 = get_probe_p95(app)
 
     print(f"\n{app} deployment status:")
     print("-" * 50)
@@ -84,7 +129,7 @@ def status(app: str) -> None:
         staging_tag = None
     elif len(staging_images) == 1:
         staging_tag = extract_tag(next(iter(staging_images)))
-        print(f"  staging: {staging_tag}")
+        print(f"  staging: {staging_tag}{format_latency(p95, 'staging')}")
     else:
         staging_tag = None
         print("  staging:")
@@ -97,7 +142,7 @@ def status(app: str) -> None:
         prod_tag = None
     elif len(prod_images) == 1:
         prod_tag = extract_tag(next(iter(prod_images)))
-        print(f"  prod:    {prod_tag}")
+        print(f"  prod:    {prod_tag}{format_latency(p95, 'prod')}")
     else:
         prod_tag = None
         print("  prod:")
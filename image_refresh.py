@@ -0,0 +1,270 @@
+"""
+Event-driven staging image updates from Artifact Registry notifications.
+
+Artifact Registry publishes a message to the `gcr` Pub/Sub topic whenever an
+image is pushed. This receiver pulls those messages and points the matching
+`<app>-staging` ArgoCD Application at the new image straight away, instead of
+waiting for the image updater's next poll.
+
+Usage:
+    image-refresh --subscription <name>     # Consume from Pub/Sub (in-cluster)
+    image-refresh --local <file>            # Replay messages from a JSON-lines file
+    image-refresh --local <file> --dry-run  # Print updates instead of applying them
+
+Each line of a local file is an Artifact Registry notification payload, e.g.:
+    {"action": "INSERT", "tag": "us-central1-docker.pkg.dev/ethans-services/containers/fitness-api:abc123-staging"}
+"""
+
+import argparse
+import base64
+import json
+import re
+import ssl
+import sys
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Protocol
+
+REGISTRY = "us-central1-docker.pkg.dev/ethans-services/containers"
+# Back-off after a failed pull; empty pulls already long-poll server-side.
+RETRY_SECONDS = 5
+PUBSUB_API = "https://pubsub.googleapis.com/v1"
+# Workload Identity token for the pod's GCP service account.
+METADATA_TOKEN_URL = (
+    "http://metadata.google.internal/computeMetadata/v1"
+    "/instance/service-accounts/default/token"
+)
+# Only commit-SHA tags are deployable; `latest`, cache tags etc. are ignored.
+STAGING_TAG = re.compile(r"^[0-9a-f]{7,}(-staging)?$")
+# In-cluster API access via the pod's service account.
+KUBERNETES_API = "https://kubernetes.default.svc"
+SERVICE_ACCOUNT_DIR = "/var/run/secrets/kubernetes.io/serviceaccount"
+
+
+@dataclass
+class Message:
+    """A single notification pulled from a queue."""
+
+    ack_id: str
+    data: bytes
+
+
+class Queue(Protocol):
+    def pull(self, max_messages: int) -> list[Message]: ...
+
+    def ack(self, ack_ids: list[str]) -> None: ...
+
+
+class PubSubQueue:
+    """Pub/Sub subscription accessed through the REST API.
+
+    `subscription` is the full `projects/<project>/subscriptions/<name>` path.
+    Access tokens come from the GKE metadata server (Workload Identity).
+    """
+
+    def __init__(self, subscription: str) -> None:
+        self.subscription = subscription
+        self.token = ""
+        self.token_expires_at = 0.0
+
+    def access_token(self) -> str:
+        if time.time() >= self.token_expires_at:
+            request = urllib.request.Request(
+                METADATA_TOKEN_URL, headers={"Metadata-Flavor": "Google"}
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                body = json.load(response)
+            self.token = body["access_token"]
+            # Refresh a minute early so a token never expires mid-request.
+            self.token_expires_at = time.time() + body["expires_in"] - 60
+        return self.token
+
+    def call(self, method: str, body: dict, timeout: float) -> dict:
+        request = urllib.request.Request(
+            f"{PUBSUB_API}/{self.subscription}:{method}",
+            data=json.dumps(body).encode(),
+            method="POST",
+            headers={
+                "Authorization": f"Bearer {self.access_token()}",
+                "Content-Type": "application/json",
+            },
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+
+    def pull(self, max_messages: int) -> list[Message]:
+        # Without returnImmediately the server holds the request open until
+        # messages arrive (or it times out), so an idle loop stays cheap.
+        try:
+            body = self.call("pull", {"maxMessages": max_messages}, timeout=90)
+        except TimeoutError:
+            return []
+        except (OSError, ValueError) as e:
+            print(f"Error pulling messages: {e}", file=sys.stderr)
+            time.sleep(RETRY_SECONDS)
+            return []
+        return [
+            Message(
+                ack_id=item["ackId"],
+                data=base64.b64decode(item["message"].get("data", "")),
+            )
+            for item in body.get("receivedMessages", [])
+        ]
+
+    def ack(self, ack_ids: list[str]) -> None:
+        if not ack_ids:
+            return
+        try:
+            self.call("acknowledge", {"ackIds": ack_ids}, timeout=10)
+        except (OSError, ValueError) as e:
+            # Unacked messages are redelivered and handled again.
+            print(f"Error acknowledging messages: {e}", file=sys.stderr)
+
+
+class LocalQueue:
+    """In-memory stand-in for a Pub/Sub subscription, for local testing."""
+
+    def __init__(self, payloads: list[bytes]) -> None:
+        self.pending = [
+            Message(ack_id=str(i), data=data) for i, data in enumerate(payloads)
+        ]
+        self.acked: list[str] = []
+
+    def pull(self, max_messages: int) -> list[Message]:
+        return self.pending[:max_messages]
+
+    def ack(self, ack_ids: list[str]) -> None:
+        self.acked.extend(ack_ids)
+        self.pending = [m for m in self.pending if m.ack_id not in ack_ids]
+
+
+def parse_notification(data: bytes) -> tuple[str, str] | None:
+    """Return (app, image) for a pushed staging image, or None to ignore it."""
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        # Covers malformed JSON and non-UTF-8 bytes (UnicodeDecodeError).
+        return None
+    if not isinstance(payload, dict) or payload.get("action") != "INSERT":
+        return None
+    image = payload.get("tag")
+    if not isinstance(image, str) or not image.startswith(f"{REGISTRY}/"):
+        return None
+    name, _, tag = image.removeprefix(f"{REGISTRY}/").partition(":")
+    # Prod tags are only ever set by `deploy promote`, and floating tags like
+    # `latest` would pin staging to whatever was pushed last.
+    if not STAGING_TAG.match(tag):
+        return None
+    return name, image
+
+
+def update_staging_image(app: str, image: str) -> bool:
+    """Point the app's staging ArgoCD Application at the given image.
+
+    Patches the Application through the Kubernetes API using the in-cluster
+    service account, so it only works when running inside the cluster.
+    Returns False only for failures worth retrying; permanent rejections
+    (4xx other than 429) return True so the message is acknowledged.
+    """
+    argocd_app = f"{app}-staging"
+    image_base = f"{REGISTRY}/{app}"
+    patch = json.dumps(
+        {
+            "spec": {
+                "source": {
+                    "kustomize": {
+                        "images": [f"{image_base}={image}"],
+                    }
+                }
+            }
+        }
+    )
+    try:
+        with open(f"{SERVICE_ACCOUNT_DIR}/token") as f:
+            token = f.read().strip()
+    except OSError as e:
+        print(
+            f"✗ No in-cluster credentials to update {argocd_app} ({e}); use --dry-run"
+        )
+        return False
+    request = urllib.request.Request(
+        f"{KUBERNETES_API}/apis/argoproj.io/v1alpha1/namespaces/argocd"
+        f"/applications/{argocd_app}",
+        data=patch.encode(),
+        method="PATCH",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/merge-patch+json",
+        },
+    )
+    context = ssl.create_default_context(cafile=f"{SERVICE_ACCOUNT_DIR}/ca.crt")
+    try:
+        with urllib.request.urlopen(request, context=context, timeout=10):
+            pass
+    except urllib.error.HTTPError as e:
+        detail = f"{e.code} {e.read().decode(errors='replace').strip()}"
+        # Client errors (e.g. 404: no <app>-staging Application for this
+        # image) won't succeed on retry, so report them as handled.
+        if 400 <= e.code < 500 and e.code != 429:
+            print(f"- Ignoring {image}: {argocd_app} rejected the update ({detail})")
+            return True
+        print(f"✗ Failed to update {argocd_app}: {detail}")
+        return False
+    except OSError as e:
+        print(f"✗ Failed to update {argocd_app}: {e}")
+        return False
+    print(f"✓ Updated {argocd_app} to {image}")
+    return True
+
+
+def print_update(app: str, image: str) -> bool:
+    """Dry-run stand-in for update_staging_image."""
+    print(f"Would update {app}-staging to {image}")
+    return True
+
+
+def process(
+    queue: Queue,
+    apply: Callable[[str, str], bool] = update_staging_image,
+    max_messages: int = 10,
+) -> int:
+    """Handle one batch of messages. Returns the number of messages pulled."""
+    messages = queue.pull(max_messages)
+    ack_ids = []
+    for message in messages:
+        parsed = parse_notification(message.data)
+        # Leave failed updates unacked so Pub/Sub redelivers them.
+        if parsed is None or apply(*parsed):
+            ack_ids.append(message.ack_id)
+    queue.ack(ack_ids)
+    return len(messages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--subscription", help="Pub/Sub subscription to consume")
+    source.add_argument("--local", help="JSON-lines file of notification payloads")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print updates instead of applying"
+    )
+    args = parser.parse_args()
+    apply = print_update if args.dry_run else update_staging_image
+
+    if args.local:
+        with open(args.local, "rb") as f:
+            local_queue = LocalQueue([line for line in f if line.strip()])
+        process(local_queue, apply, max_messages=len(local_queue.pending))
+        return
+
+    queue = PubSubQueue(args.subscription)
+    while True:
+        process(queue, apply)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import io
+import json
+import unittest
+import urllib.parse
+from unittest import mock
+
+from deploy import format_latency, get_probe_p95
+
+
+def prometheus_response(results: list[tuple[dict, str]]) -> io.BytesIO:
+    body = {
+        "status": "success",
+        "data": {
+            "resultType": "vector",
+            "result": [
+                {"metric": metric, "value": [1760000000, value]}
+                for metric, value in results
+            ],
+        },
+    }
+    return io.BytesIO(json.dumps(body).encode())
+
+
+class GetProbeP95Test(unittest.TestCase):
+    def query_p95(self, response: io.BytesIO) -> tuple[dict[str, float], str]:
+        with (
+            mock.patch("deploy.run", return_value="token"),
+            mock.patch("urllib.request.urlopen", return_value=response) as urlopen,
+        ):
+            p95 = get_probe_p95("fitness-api")
+        url = urlopen.call_args.args[0].full_url
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)["query"][0]
+        return p95, query
+
+    def test_query_keeps_one_series_per_environment(self) -> None:
+        _, query = self.query_p95(prometheus_response([]))
+        # Every probed path and scrape job must collapse into one value per
+        # probe_env, or the per-environment lookup would pick one arbitrarily.
+        self.assertTrue(query.startswith("max by (probe_env) ("))
+        self.assertIn(
+            'probe:duration_seconds:p95_10m{probe_service="fitness-api"}', query
+        )
+
+    def test_returns_latency_per_environment(self) -> None:
+        p95, _ = self.query_p95(
+            prometheus_response(
+                [({"probe_env": "staging"}, "0.25"), ({"probe_env": "prod"}, "0.1")]
+            )
+        )
+        self.assertEqual(p95, {"staging": 0.25, "prod": 0.1})
+
+    def test_missing_gcloud_returns_nothing(self) -> None:
+        with mock.patch("deploy.run", side_effect=FileNotFoundError):
+            self.assertEqual(get_probe_p95("fitness-api"), {})
+
+
+class FormatLatencyTest(unittest.TestCase):
+    def test_formats_known_environments_only(self) -> None:
+        self.assertEqual(format_latency({"prod": 0.1234}, "prod"), "  (p95 123ms)")
+        self.assertEqual(format_latency({"prod": 0.1234}, "staging"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import json
+import unittest
+import urllib.error
+from unittest import mock
+
+import image_refresh
+from image_refresh import (
+    REGISTRY,
+    LocalQueue,
+    parse_notification,
+    process,
+    update_staging_image,
+)
+
+
+def notification(tag: str, action: str = "INSERT") -> bytes:
+    return json.dumps({"action": action, "tag": f"{REGISTRY}/{tag}"}).encode()
+
+
+class ParseNotificationTest(unittest.TestCase):
+    def test_accepts_sha_tags(self) -> None:
+        for tag in ["abc1234-staging", "abc1234"]:
+            self.assertEqual(
+                parse_notification(notification(f"fitness-api:{tag}")),
+                ("fitness-api", f"{REGISTRY}/fitness-api:{tag}"),
+            )
+
+    def test_ignores_other_tags(self) -> None:
+        for tag in ["abc1234-prod", "latest", "buildcache", "abc-staging", ""]:
+            self.assertIsNone(parse_notification(notification(f"fitness-api:{tag}")))
+
+    def test_ignores_non_insert_actions(self) -> None:
+        self.assertIsNone(
+            parse_notification(notification("fitness-api:abc1234", action="DELETE"))
+        )
+
+    def test_ignores_malformed_payloads(self) -> None:
+        for data in [b"[1,2]", b'"text"', b"null", b"{", b"\xff\xfe", b'{"tag": 1}']:
+            self.assertIsNone(parse_notification(data))
+
+
+class ProcessTest(unittest.TestCase):
+    def test_applies_staging_images_and_acks_everything_handled(self) -> None:
+        queue = LocalQueue(
+            [
+                notification("fitness-api:abc1234-staging"),
+                notification("fitness-api:latest"),
+                b"[1,2]",
+                b"\xff",
+            ]
+        )
+        applied = []
+
+        def apply(app: str, image: str) -> bool:
+            applied.append((app, image))
+            return True
+
+        self.assertEqual(process(queue, apply), 4)
+        self.assertEqual(
+            applied, [("fitness-api", f"{REGISTRY}/fitness-api:abc1234-staging")]
+        )
+        self.assertEqual(queue.pending, [])
+        self.assertEqual(sorted(queue.acked), ["0", "1", "2", "3"])
+
+    def test_failed_updates_stay_pending(self) -> None:
+        queue = LocalQueue([notification("identity:abc1234-staging")])
+        process(queue, lambda app, image: False)
+        self.assertEqual([m.ack_id for m in queue.pending], ["0"])
+        self.assertEqual(queue.acked, [])
+
+
+class UpdateStagingImageTest(unittest.TestCase):
+    image = f"{REGISTRY}/fitness-api:abc1234-staging"
+
+    def update_with_response(self, code: int) -> bool:
+        error = urllib.error.HTTPError("url", code, "error", {}, io.BytesIO())  # type: ignore[arg-type]
+        with (
+            mock.patch("builtins.open", mock.mock_open(read_data="token")),
+            mock.patch("ssl.create_default_context"),
+            mock.patch("urllib.request.urlopen", side_effect=error),
+        ):
+            return update_staging_image("fitness-api", self.image)
+
+    def test_missing_in_cluster_credentials_is_a_retryable_failure(self) -> None:
+        with mock.patch.object(image_refresh, "SERVICE_ACCOUNT_DIR", "/nonexistent"):
+            self.assertFalse(update_staging_image("fitness-api", self.image))
+
+    def test_client_errors_are_acknowledged(self) -> None:
+        self.assertTrue(self.update_with_response(404))
+
+    def test_transient_errors_are_retried(self) -> None:
+        for code in [429, 500, 503]:
+            self.assertFalse(self.update_with_response(code))
+
+
+if __name__ == "__main__":
+    unittest.main()